@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# asyncio version of the GUID API client, for issuing many operations concurrently
+
+import aiohttp
+
+from .client import _dumps
+
+_SESSION = None
+# One aiohttp session shared by all coroutines so their requests multiplex over the same keep-alive pool.
+# It is created lazily because an aiohttp session has to be created inside a running event loop.
+
+
+def _session():
+    """ returns the shared aiohttp.ClientSession, creating it on first use """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64, ttl_dns_cache=300),
+                                         json_serialize=_dumps)
+    return _SESSION
+
+
+async def close():
+    """ closes the shared session, call once all operations have completed """
+    global _SESSION
+    if _SESSION is not None:
+        await _SESSION.close()
+        _SESSION = None
+
+
+def http2_client():
+    """ returns a httpx.AsyncClient speaking HTTP/2, which can be passed as 'client' to the request coroutines
+
+    Concurrent requests are multiplexed as streams over a single connection instead of each needing
+    its own connection from the pool. Requires httpx with HTTP/2 support (pip install 'httpx[http2]').
+    The caller owns the client and should close it with 'await client.aclose()'.
+    """
+    import httpx
+    return httpx.AsyncClient(http2=True, limits=httpx.Limits(max_keepalive_connections=32))
+
+
+async def _do_request(method, url, data=None, client=None):
+    """ issues a single HTTP request
+
+    Keyword arguments:
+    method -- HTTP method, e.g. 'GET'
+    url -- full request URL
+    data -- dict sent as the JSON request body, defaults to None (no body)
+    client -- a httpx.AsyncClient, e.g. from http2_client(), defaults to None (use the shared aiohttp session)
+    :returns (status, text) tuple of the HTTP response
+    """
+    if client is not None:
+        response = await client.request(method, url, json=data)
+        return response.status_code, response.text
+    async with _session().request(method, url, json=data) as response:
+        return response.status, await response.text()
+
+
+async def create_request(url, user, guid=None, expire=None, client=None):
+    """ handles the two CREATE GUID API cases """
+
+    if guid is None:
+        # If no GUID is specified, the server generates one. The expire option is ignored.
+        return await _do_request('POST', url + "/guid", {"user": user}, client)
+    # GUID is specified and this updates the expire time for the GUID
+    return await _do_request('POST', "%s/guid/%s" % (url, guid), {"user": user, "expire": expire}, client)
+
+
+async def read_request(url, guid, client=None):
+    """ handles the READ GUID API case """
+
+    return await _do_request('GET', "%s/guid/%s" % (url, guid), client=client)
+
+
+async def update_request(url, guid, expire, client=None):
+    """ handles the UPDATE GUID API case """
+
+    return await _do_request('POST', "%s/guid/%s" % (url, guid), {"expire": expire}, client)
+
+
+async def delete_request(url, guid, client=None):
+    """ handles the DELETE GUID API case """
+
+    return await _do_request('DELETE', "%s/guid/%s" % (url, guid), client=client)
@@ -4,35 +4,68 @@
 import argparse
 import json
 import re
-import requests
-from requests.utils import urlparse
-import string
+import sys
 import time
+from urllib.parse import urlparse
 
 __version__ = '0.1'
 
-session = requests.session()
+_SESSION = None
 # One session instance per command line invocation since this tool only handles one operation at a time.
-# This is used throughout and allows for the request_mock library to be injected
+# This is used throughout and allows for the request_mock library to be injected.
+# requests is imported on first use so that --help/--version don't pay for loading it (and urllib3, ssl, ...)
+
+
+def _session():
+    """ returns the shared requests.Session, creating it on first use """
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.packages.urllib3.util.retry import Retry
+
+        _SESSION = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64,
+                              max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                                                raise_on_status=False))
+        _SESSION.mount('http://', adapter)
+        _SESSION.mount('https://', adapter)
+        # pooled keep-alive connections so library callers issuing many operations reuse TCP/TLS connections.
+        # only idempotent methods (GET, DELETE, ...) are retried; a retried POST to /guid could create a second GUID.
+        # the 'mock' prefix is left alone so mock_server() can still inject its adapter
+    return _SESSION
+
+
+try:
+    import orjson
+except ImportError:
+    _dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    # one encoder configured once and reused, producing compact JSON
+    _loads = json.loads
+else:
+    # orjson is an optional, faster drop-in; it emits the same compact JSON as bytes
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+    _loads = orjson.loads
+
+_GUID_RE = re.compile(r'\A[0-9A-F]{32}\Z').match
+# compiled once; matches the whole GUID in C rather than testing each character in Python
 
 
 def guid(guid):
     """ verifies GUID is in a valid format. helper function for argparse. """
 
-    # GUID is a string that needs to be 32 characters
-    if len(guid) != 32:
-        raise argparse.ArgumentTypeError("GUID needs to be 32 characters")
-
-    # GUID is all uppercase hexadecimal digits [0-9A-F]
-    if not all([x in string.hexdigits.upper() for x in guid]):
-        raise argparse.ArgumentTypeError("GUID is not a upper-case hexadecimal number")
+    # GUID is a string of exactly 32 uppercase hexadecimal digits [0-9A-F]
+    if not _GUID_RE(guid):
+        raise argparse.ArgumentTypeError("GUID needs to be 32 upper-case hexadecimal digits")
     return guid
 
 
 def future_time(epoch_time):
     """ verifies that the time (seconds since epoch) is after the current time. helper function for argparse """
 
-    if time.time() > int(epoch_time):
+    epoch_time = int(epoch_time)
+    if epoch_time <= int(time.time()):
         raise argparse.ArgumentTypeError("Specified time is not in the future")
     return epoch_time
 
@@ -87,6 +120,11 @@ def add_common_args(parser):
     parser.add_argument('--url', help="endpoint URL", required=True, type=url)
 
 
+_STREAM_THRESHOLD = 4096
+# response bodies at least this many bytes (or of unknown length) are streamed to stdout
+# the handlers request with stream=True so the body is only read here
+
+
 def handle_response(request_func):
     """ decorator that handles HTTP Response, displaying info on success or failure.
 
@@ -96,18 +134,30 @@ def handle_response(request_func):
     """
 
     def wrapper(args):
+        from requests.exceptions import RequestException
+        # already loaded by _session() at this point
+
         r = request_func(args)
         try:
             r.raise_for_status()
             # this simply raises an exception for any HTTP error code (4xx or 5xx)
-        except requests.exceptions.RequestException as e:
+        except RequestException as e:
             print(e)
-            # consider sys.exit(1) instead
+            sys.exit(1)
         else:
             # prints the JSON output, consider a generic function that parses the returned JSON
-            print(r.text)
-            print("Success")
-            # consider sys.exit(0) instead
+            if int(r.headers.get('Content-Length', _STREAM_THRESHOLD)) < _STREAM_THRESHOLD:
+                sys.stdout.write(r.text + "\nSuccess\n")
+                # one write instead of two print() calls
+            else:
+                # large or unknown-length bodies are copied through in chunks rather than held in memory
+                if r.encoding is None:
+                    r.encoding = 'utf-8'  # JSON default, otherwise iter_content yields bytes
+                for chunk in r.iter_content(chunk_size=8192, decode_unicode=True):
+                    sys.stdout.write(chunk)
+                sys.stdout.write("\nSuccess\n")
+            sys.exit(0)
+            # exit status lets shell scripts detect failure without parsing the output
     return wrapper
 
 
@@ -118,12 +168,10 @@ def create_request(args):
     if args.guid is None:
         # If no GUID is specified, the server generates one. The expire option is ignored.
         # Consider throwing an error if expire is specified.
-        body = json.dumps({"user": args.user})
-        response = session.post(args.url + "/guid", data=body)
+        response = _session().post(args.url + "/guid", json={"user": args.user}, stream=True)
     else:
         # GUID is specified and this updates the expire time for the GUID
-        body = json.dumps({"user": args.user, "expire": args.expire})
-        response = session.post(args.url + "/guid/%s" % args.guid, data=body)
+        response = _session().post("%s/guid/%s" % (args.url, args.guid), json={"user": args.user, "expire": args.expire}, stream=True)
     return response
 
 
@@ -131,7 +179,7 @@ def create_request(args):
 def read_request(args):
     """ handles the READ GUID API case """
 
-    response = session.get(args.url + "/guid/%s" % args.guid)
+    response = _session().get("%s/guid/%s" % (args.url, args.guid), stream=True)
     return response
 
 
@@ -139,7 +187,7 @@ def read_request(args):
 def update_request(args):
     """ handles the UPDATE GUID API case """
 
-    response = session.post(args.url + "/guid/%s" % args.guid, data=json.dumps({"expire": args.expire}))
+    response = _session().post("%s/guid/%s" % (args.url, args.guid), json={"expire": args.expire}, stream=True)
     return response
 
 
@@ -147,19 +195,11 @@ def update_request(args):
 def delete_request(args):
     """ handles the DELETE GUID API case """
 
-    response = session.delete(args.url + "/guid/%s" % args.guid)
+    response = _session().delete("%s/guid/%s" % (args.url, args.guid), stream=True)
     return response
 
 
-def main():
-    parser = argparse.ArgumentParser(description='GUID client')
-    parser.add_argument('--version', action='version', version=' '.join(['%(prog)s', __version__]))
-    # string.join is faster than string concatenation via '+'
-
-    subparsers = parser.add_subparsers(help='\'[sub-command] -h\' for further help on listed sub-commands')
-    # create subparsers for each API call
-    # use the helper functions to specify which arguments are required for each API call
-
+def _build_create_parser(subparsers):
     parser_create = subparsers.add_parser('create', help='create a GUID')
     add_expire(parser=parser_create)
     add_user(parser=parser_create, required=True)
@@ -168,22 +208,56 @@ def main():
     parser_create.set_defaults(func=create_request)
     # this lets us call 'func' later to invoke the handler for each API call
 
+
+def _build_read_parser(subparsers):
     parser_read = subparsers.add_parser('read', help='read a GUID')
     add_guid(parser=parser_read, required=True)
     add_common_args(parser=parser_read)
     parser_read.set_defaults(func=read_request)
 
+
+def _build_update_parser(subparsers):
     parser_update = subparsers.add_parser('update', help='update a GUID')
     add_guid(parser=parser_update, required=True)
     add_expire(parser=parser_update, required=True)
     add_common_args(parser=parser_update)
     parser_update.set_defaults(func=update_request)
 
+
+def _build_delete_parser(subparsers):
     parser_delete = subparsers.add_parser('delete', help='delete a GUID')
     add_guid(parser=parser_delete, required=True)
     add_common_args(parser=parser_delete)
     parser_delete.set_defaults(func=delete_request)
 
+
+_BUILDERS = {
+    'create': _build_create_parser,
+    'read': _build_read_parser,
+    'update': _build_update_parser,
+    'delete': _build_delete_parser,
+}
+# sub-command name -> function that adds its subparser; listed in the order shown by --help
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GUID client',
+                                     epilog='exit status is 0 on success and 1 on a HTTP error response')
+    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__)
+
+    subparsers = parser.add_subparsers(help='\'[sub-command] -h\' for further help on listed sub-commands')
+    # create subparsers for each API call
+    # use the helper functions to specify which arguments are required for each API call
+
+    builder = _BUILDERS.get(sys.argv[1]) if len(sys.argv) > 1 else None
+    if builder is not None:
+        # only the requested sub-command's parser is needed
+        builder(subparsers)
+    else:
+        # -h, --version, or an unknown sub-command: build them all so help and errors list every choice
+        for builder in _BUILDERS.values():
+            builder(subparsers)
+
     parsed = parser.parse_args()
     if parsed.url.startswith("mock://"):
         # if there is a mock:// URL, we simulate the server so that the client
@@ -192,72 +266,73 @@ def main():
     parsed.func(parsed)
 
 
+_MOCK_RE = re.compile(r'mock://test\.net/guid')  # assumes mock://test.net is passed in on CLI
+_MOCK_ERR = {"9": (503, "mock server error test"), "8": (404, "mock client error test")}
+# if the first character of the guid is 9, fake a HTTP server error code; if it is 8, fake a HTTP client error code
+_MOCK_READ_TEMPLATE = '{"guid": "%s", "expire": "1234123123123", "user": "foo"}'
+# pre-serialized READ response; the guid comes from the percent-encoded URI path so it needs no JSON escaping
+
+_GUID_PREFIX = "/guid/"
+
+
+def _parse_guid(req, default=""):
+    # returns the <guid> from a /guid/<guid> URI path, or default if the path has no guid (e.g. CREATE on /guid)
+    if req.path.startswith(_GUID_PREFIX):
+        return req.path[len(_GUID_PREFIX):]
+    return default
+
+
+
+def _read_callback(req, context):
+    # dynamically mocks READ calls, returns the passed-in GUID in the JSON response
+
+    guid = _parse_guid(req)
+    err = _MOCK_ERR.get(guid[:1])
+    if err:
+        context.status_code, context.reason = err
+    # generate JSON output regardless of error code.
+    return _MOCK_READ_TEMPLATE % guid
+
+
+def _create_update_callback(req, context):
+    # dynamically mocks CREATE/UPDATE calls, returns the passed-in GUID, USER, and EXPIRE
+    # in the JSON response
+
+    guid = _parse_guid(req, default="77777777777777")
+    body = _loads(req.text)
+    response = body
+    # CREATE and UPDATE returns EXPIRE, USER, and GUID in all calls
+    if "expire" not in body:
+        response['expire'] = "999999999999"  # provide fake if not specified in request
+    if "user" not in body:
+        response['user'] = "mock generated"  # provide fake if not specified in request
+    response['guid'] = guid
+    err = _MOCK_ERR.get(guid[:1])
+    if err:
+        context.status_code, context.reason = err
+    return _dumps(response)
+
+
+def _delete_callback(req, context):
+    guid = _parse_guid(req)
+    err = _MOCK_ERR.get(guid[:1])
+    if err:
+        context.status_code, context.reason = err
+    # delete generates no output
+    return ""
+
+
 def mock_server():
     """ creates a mock server that handles API requests and allows for testing of HTTP error codes. """
     import requests_mock
     adapter = requests_mock.Adapter()
-    session.mount('mock', adapter)
+    _session().mount('mock', adapter)
     # inject mock server into all future HTTP requests
 
-    def read_callback(req, context):
-        # dynamically mocks READ calls, returns the passed-in GUID in the JSON response
-
-        guid = req.path[6:]  # assumes URI path is /guid/<guid>
-        if guid[0] == "9":
-            # if the first character of the guid is 9, fake a HTTP server error code
-            context.status_code = 503
-            context.reason = "mock server error test"
-        if guid[0] == "8":
-            # if the first character of the guid is 8, fake a HTTP client error code
-            context.status_code = 404
-            context.reason = "mock client error test"
-        # generate JSON output regardless of error code.
-        return json.dumps({"guid": guid, "expire": "1234123123123", "user": "foo"})
-
-    def create_update_callback(req, context):
-        # dynamically mocks CREATE/UPDATE calls, returns the passed-in GUID, USER, and EXPIRE
-        # in the JSON response
-
-        guid = "77777777777777"
-        if len(req.path) > 5:
-            guid = req.path[6:]  # assumes URI path is /guid/<guid>
-        body = json.loads(req.text)
-        response = body
-        # CREATE and UPDATE returns EXPIRE, USER, and GUID in all calls
-        if "expire" not in body:
-            response['expire'] = "999999999999"  # provide fake if not specified in request
-        if "user" not in body:
-            response['user'] = "mock generated"  # provide fake if not specified in request
-        response['guid'] = guid
-        if guid[0] == "9":
-            # if the first character of the guid is 9, fake a HTTP server error code
-
-            context.status_code = 503
-            context.reason = "mock server error test"
-        if guid[0] == "8":
-            # if the first character of the guid is 8, fake a HTTP client error code
-
-            context.status_code = 404
-            context.reason = "mock client error test"
-        return json.dumps(response)
-
-    def delete_callback(req, context):
-        guid = req.path[6:]  # assumes URI path is /guid/<guid>
-        if guid[0] == "9":
-            # if the first character of the guid is 9, fake a HTTP server error code
-            context.status_code = 503
-            context.reason = "mock server error test"
-        if guid[0] == "8":
-            # if the first character of the guid is 8, fake a HTTP client error code
-            context.status_code = 404
-            context.reason = "mock client error test"
-        # delete generates no output
-        return ""
-
-    mock_re = re.compile('mock://test.net/guid')  # assumes mock://test.net is passed in on CLI
-    adapter.register_uri('GET', mock_re, text=read_callback)
-    adapter.register_uri('POST', mock_re, text=create_update_callback)
-    adapter.register_uri('DELETE', mock_re, text=delete_callback)
+    adapter.register_uri('GET', _MOCK_RE, text=_read_callback)
+    adapter.register_uri('POST', _MOCK_RE, text=_create_update_callback)
+    adapter.register_uri('DELETE', _MOCK_RE, text=_delete_callback)
+
 
 if __name__ == '__main__':
     main()